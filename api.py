@@ -5,22 +5,34 @@ Provides REST API endpoints for document conversion to Markdown/JSON
 
 import os
 import time
+import asyncio
 import logging
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional, Dict, Any, List
 from enum import Enum
 import tempfile
+import hashlib
+import weakref
+import uuid
+import mimetypes
+from email.message import Message
 import httpx
 from pathlib import Path
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form, BackgroundTasks
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, BackgroundTasks, Query
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field, HttpUrl
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from cachetools import TTLCache
+import orjson
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
 from fastapi.responses import Response
 
-from docling.document_converter import DocumentConverter
+from docling.document_converter import DocumentConverter, PdfFormatOption
 from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PipelineOptions
+from docling.datamodel.pipeline_options import PdfPipelineOptions
 
 # Configure logging
 logging.basicConfig(
@@ -29,16 +41,122 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Thread pool used for blocking conversion/export work so the event loop stays free
+CONVERTER_THREADS = int(os.getenv("DOCLING_CONVERTER_THREADS", "4"))
+executor = ThreadPoolExecutor(max_workers=CONVERTER_THREADS, thread_name_prefix="docling-convert")
+
+# Optional process pool so conversions don't contend on the GIL; 0 keeps conversions in threads.
+# Each worker process holds its own DocumentConverter and models, so size it against available memory.
+PROCESS_WORKERS = int(os.getenv("DOCLING_PROCESS_WORKERS", "0"))
+
+# Cap concurrent heavy conversions; callers waiting longer than the timeout get a 503.
+# With a process pool the default matches its size, so no worker sits idle.
+MAX_CONCURRENT_CONVERSIONS = int(os.getenv("DOCLING_MAX_CONCURRENT", str(PROCESS_WORKERS or 2)))
+CONVERTER_LOCK_TIMEOUT = float(os.getenv("CONVERTER_LOCK_TIMEOUT", "5"))
+conversion_semaphore = asyncio.Semaphore(MAX_CONCURRENT_CONVERSIONS)
+
+# Uploads are streamed to disk in chunks and rejected once they exceed the limit
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1 << 20
+# Headroom on top of the file limit for multipart framing and the other form fields
+MAX_UPLOAD_REQUEST_SIZE = MAX_UPLOAD_SIZE + 64 * 1024
+
+# Serialized JSON documents above this size are spilled to a temp file instead of held in memory
+JSON_SPILL_THRESHOLD = int(os.getenv("DOCLING_JSON_SPILL_MB", "16")) * 1024 * 1024
+
+# Media types used when streaming text-like output
+STREAM_MEDIA_TYPES = {
+    "markdown": "text/markdown; charset=utf-8",
+    "doctags": "text/plain; charset=utf-8",
+    "text": "text/plain; charset=utf-8",
+}
+
+# Optional warmup conversion at startup so the first request doesn't pay model load cost
+WARMUP_ENABLED = os.getenv("WARMUP", "0") == "1"
+WARMUP_DOCUMENT = os.getenv("WARMUP_DOCUMENT", str(Path(__file__).parent / "warmup.pdf"))
+
+
+def cached_entry_size(entry) -> int:
+    """Approximate size in bytes of a cached (format, payload, page count, ...) entry
+
+    Payloads are exported text or, for JSON, the already serialized document bytes.
+    """
+    return len(entry[1])
+
+
+# Cache of URL conversions: key -> (format, payload, page count, source validator), bounded by payload bytes
+URL_CACHE_BYTES = int(os.getenv("DOCLING_URL_CACHE_MB", "256")) * 1024 * 1024
+URL_CACHE_TTL = float(os.getenv("DOCLING_URL_CACHE_TTL", "3600"))
+url_cache = TTLCache(maxsize=URL_CACHE_BYTES, ttl=URL_CACHE_TTL, getsizeof=cached_entry_size)
+# One lock per in-flight key so identical concurrent cache misses convert only once
+url_cache_locks = weakref.WeakValueDictionary()
+
+# Cache of upload conversions keyed by content hash and options, bounded by payload bytes
+UPLOAD_CACHE_BYTES = int(os.getenv("DOCLING_UPLOAD_CACHE_MB", "256")) * 1024 * 1024
+UPLOAD_CACHE_TTL = float(os.getenv("DOCLING_UPLOAD_CACHE_TTL", "3600"))
+upload_cache = TTLCache(maxsize=UPLOAD_CACHE_BYTES, ttl=UPLOAD_CACHE_TTL, getsizeof=cached_entry_size)
+
+
+def finished_job_size(entry) -> int:
+    """Approximate size in bytes of a finished (job, result size, result path) entry"""
+    return entry[1]
+
+
+def discard_job_result(entry):
+    """Remove the spilled result file of a finished job entry, if it has one"""
+    result_path = entry[2]
+    if result_path is not None:
+        try:
+            os.unlink(result_path)
+        except FileNotFoundError:
+            pass
+
+
+class JobStore(TTLCache):
+    """TTL store for finished jobs that deletes spilled result files as entries leave it"""
+
+    def popitem(self):
+        key, entry = super().popitem()
+        discard_job_result(entry)
+        return key, entry
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for _, entry in expired:
+            discard_job_result(entry)
+        return expired
+
+    def clear(self):
+        self.expire()
+        for entry in self.values():
+            discard_job_result(entry)
+        super().clear()
+
+
+# Background job queue for asynchronous conversions; results are kept for a limited time
+JOB_WORKERS = int(os.getenv("DOCLING_JOB_WORKERS", str(os.cpu_count() or 1)))
+JOB_QUEUE_SIZE = int(os.getenv("DOCLING_JOB_QUEUE_SIZE", "100"))
+JOB_RESULT_TTL = float(os.getenv("DOCLING_JOB_RESULT_TTL", "3600"))
+JOB_RESULT_BYTES = int(os.getenv("DOCLING_JOB_RESULT_MB", "256")) * 1024 * 1024
+# Fixed size charged per finished job on top of its result, so failed jobs count too
+JOB_ENTRY_OVERHEAD = 1024
+job_queue = asyncio.Queue(maxsize=JOB_QUEUE_SIZE)
+# Queued and running jobs are never evicted; they move to the TTL store once finished.
+# Finished jobs are bounded by result bytes; large JSON results live in temp files.
+pending_jobs: Dict[str, Dict[str, Any]] = {}
+finished_jobs = JobStore(maxsize=JOB_RESULT_BYTES, ttl=JOB_RESULT_TTL, getsizeof=finished_job_size)
+
 # Prometheus metrics
 conversion_counter = Counter('docling_conversions_total', 'Total number of document conversions', ['format', 'status'])
 conversion_duration = Histogram('docling_conversion_duration_seconds', 'Duration of document conversions')
-active_conversions = Counter('docling_active_conversions', 'Number of currently active conversions')
+active_conversions = Gauge('docling_active_conversions', 'Number of currently active conversions')
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Docling API",
     description="Document parsing and conversion service powered by Docling",
     version="2.61.1",
+    default_response_class=ORJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json"
@@ -62,6 +180,23 @@ class OutputFormat(str, Enum):
     text = "text"
 
 
+class JobResponse(BaseModel):
+    """Response model for asynchronous conversion jobs"""
+    job_id: str = Field(..., description="Job identifier")
+    status: str = Field(..., description="Job status: queued, running, completed or failed")
+    result: Optional[Dict[str, Any]] = Field(None, description="Conversion result once completed")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+
+
+# Response field and document export method for each output format
+EXPORTERS = {
+    OutputFormat.markdown: ("content", "export_to_markdown"),
+    OutputFormat.json: ("document", "export_to_dict"),
+    OutputFormat.doctags: ("content", "export_to_doctags"),
+    OutputFormat.text: ("content", "export_to_text"),
+}
+
+
 class ConvertRequest(BaseModel):
     """Request model for URL-based conversion"""
     url: HttpUrl = Field(..., description="URL of the document to convert")
@@ -81,6 +216,10 @@ class ConvertRequest(BaseModel):
         True,
         description="Enable formula extraction"
     )
+    stream: bool = Field(
+        False,
+        description="Stream text-like output as a raw body instead of a JSON envelope"
+    )
 
 
 class ConvertResponse(BaseModel):
@@ -93,6 +232,511 @@ class ConvertResponse(BaseModel):
     duration_seconds: float = Field(..., description="Time taken for conversion")
 
 
+def route_path(scope) -> str:
+    """Request path relative to the app's root path, without a trailing slash"""
+    path, root_path = scope["path"], scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    return path.rstrip("/") or "/"
+
+
+class UploadSizeLimitMiddleware:
+    """Reject oversized uploads before their body is parsed
+
+    Plain ASGI middleware: only /convert/upload requests are inspected, and all
+    other requests and every response pass through untouched. A Content-Length
+    over the limit is rejected before any of the body is read; without one
+    (chunked uploads) the body is counted as it arrives.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or route_path(scope) != "/convert/upload":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = None
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    content_length = int(value)
+                except ValueError:
+                    pass
+                break
+
+        if content_length is None:
+            await self.app(scope, self.limit_body(receive), send)
+            return
+
+        if content_length > MAX_UPLOAD_REQUEST_SIZE:
+            logger.warning(f"Rejecting upload with Content-Length {content_length}")
+            response = JSONResponse(status_code=413, content={"detail": "File size exceeds 100MB limit"})
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def limit_body(receive):
+        """Wrap receive to fail with 413 once the body passes the upload limit"""
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > MAX_UPLOAD_REQUEST_SIZE:
+                    logger.warning(f"Rejecting chunked upload after {received} bytes")
+                    # Raised while the endpoint parses the form, so FastAPI answers with the 413
+                    raise HTTPException(status_code=413, detail="File size exceeds 100MB limit")
+            return message
+
+        return limited_receive
+
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
+
+@functools.lru_cache(maxsize=4)
+def converter_for(do_ocr: bool, do_table_structure: bool) -> DocumentConverter:
+    """Return a shared DocumentConverter for the given PDF pipeline flags
+
+    The global converter uses the defaults (OCR and table structure on); every
+    other combination gets its own converter, which loads its models on first use.
+    """
+    if do_ocr and do_table_structure and converter is not None:
+        return converter
+    pipeline_options = PdfPipelineOptions(do_ocr=do_ocr, do_table_structure=do_table_structure)
+    return DocumentConverter(format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)})
+
+
+async def acquire_conversion_slot(timeout: Optional[float] = CONVERTER_LOCK_TIMEOUT):
+    """Wait for a free conversion slot, failing fast with 503 when the server is saturated
+
+    Background jobs pass timeout=None and wait as long as needed.
+    """
+    try:
+        await asyncio.wait_for(conversion_semaphore.acquire(), timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning("No conversion slot available, rejecting request")
+        raise HTTPException(status_code=503, detail="Server busy, please retry later")
+
+
+def url_cache_key(request: ConvertRequest) -> str:
+    """Build the cache key for a URL conversion from the URL and all conversion options"""
+    raw = repr((
+        str(request.url),
+        request.output_format.value,
+        request.ocr_enabled,
+        request.table_extraction,
+        request.formula_extraction,
+    ))
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+async def fetch_url_validator(url: str) -> Optional[str]:
+    """Return the ETag (or Last-Modified) of a remote document, None if unavailable"""
+    try:
+        response = await app.state.http.head(url, timeout=10)
+        if response.status_code >= 400:
+            return None
+        return response.headers.get("etag") or response.headers.get("last-modified")
+    except httpx.HTTPError as e:
+        logger.warning(f"Could not fetch validator for {url}: {e}")
+        return None
+
+
+def init_process_worker():
+    """Prepare a process pool worker with its own DocumentConverter and warm models"""
+    global converter
+    if converter is None:
+        converter = DocumentConverter()
+    if WARMUP_ENABLED and Path(WARMUP_DOCUMENT).is_file():
+        try:
+            converter.convert(WARMUP_DOCUMENT)
+        except Exception as e:
+            logger.warning(f"Worker warmup conversion failed: {str(e)}")
+
+
+def process_worker_ready() -> int:
+    """No-op task used to start pool workers (and run their initializer) ahead of the first request"""
+    return os.getpid()
+
+
+def create_process_pool() -> ProcessPoolExecutor:
+    """Create the conversion process pool; workers use spawn since forking a threaded server is unsafe"""
+    return ProcessPoolExecutor(
+        max_workers=PROCESS_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_process_worker
+    )
+
+
+async def prestart_process_pool(process_pool: ProcessPoolExecutor):
+    """Start every pool worker now, so model loading and warmup don't land on the first requests"""
+    logger.info(f"Starting process pool with {PROCESS_WORKERS} conversion workers")
+    loop = asyncio.get_running_loop()
+    pids = await asyncio.gather(*[
+        loop.run_in_executor(process_pool, process_worker_ready) for _ in range(PROCESS_WORKERS)
+    ])
+    logger.info(f"Process pool ready, workers: {sorted(set(pids))}")
+
+
+def log_pool_restart_failure(task: asyncio.Task):
+    """Log a failed process pool restart, which would otherwise go unnoticed in its background task"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Restarting the conversion process pool failed: {task.exception()!r}")
+
+
+def convert_in_worker(source: str, do_ocr: bool, do_table_structure: bool, output_format: str):
+    """Convert and export a document inside a process pool worker, returning (payload, page_count)"""
+    result = converter_for(do_ocr, do_table_structure).convert(source)
+    document = result.document
+    # Release page images and backends held by the conversion result before exporting
+    del result
+    page_count = len(document.pages) if hasattr(document, 'pages') else 0
+    return export_payload(document, OutputFormat(output_format)), page_count
+
+
+async def convert_and_export(source: str, output_format: OutputFormat, ocr_enabled: bool,
+                             table_extraction: bool, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a local document and export it, in the process pool when enabled, else in a thread"""
+    process_pool = app.state.process_pool
+    if process_pool is None:
+        with conversion_duration.time():
+            result = await asyncio.to_thread(converter_for(ocr_enabled, table_extraction).convert, source)
+        document = result.document
+        # Release page images and backends held by the conversion result before exporting
+        del result
+        return await export_document(document, output_format, metadata)
+
+    try:
+        with conversion_duration.time():
+            payload, page_count = await asyncio.get_running_loop().run_in_executor(
+                process_pool, convert_in_worker, source, ocr_enabled, table_extraction, output_format.value
+            )
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); replace the pool so later requests don't all fail
+        if app.state.process_pool is process_pool:
+            logger.error("Conversion process pool is broken, recreating it")
+            process_pool.shutdown(wait=False, cancel_futures=True)
+            app.state.process_pool = create_process_pool()
+            app.state.pool_restart = asyncio.create_task(prestart_process_pool(app.state.process_pool))
+            app.state.pool_restart.add_done_callback(log_pool_restart_failure)
+        raise
+    metadata["page_count"] = page_count
+    return {
+        "status": "success",
+        "format": output_format.value,
+        EXPORTERS[output_format][0]: payload,
+        "metadata": metadata
+    }
+
+
+def export_payload(document, output_format: OutputFormat):
+    """Export a document in the requested format; JSON documents are serialized to bytes here, once"""
+    payload = getattr(document, EXPORTERS[output_format][1])()
+    if output_format == OutputFormat.json:
+        return orjson.dumps(payload)
+    return payload
+
+
+async def export_document(document, output_format: OutputFormat, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Export a converted document in the requested format and build the response data"""
+    metadata["page_count"] = len(document.pages) if hasattr(document, 'pages') else 0
+    payload = await asyncio.to_thread(export_payload, document, output_format)
+    return {
+        "status": "success",
+        "format": output_format.value,
+        EXPORTERS[output_format][0]: payload,
+        "metadata": metadata
+    }
+
+
+def serializable(response_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Return response data ready for orjson, embedding a pre-serialized JSON document as a fragment"""
+    document = response_data.get("document")
+    if isinstance(document, bytes):
+        return {**response_data, "document": orjson.Fragment(document)}
+    return response_data
+
+
+def is_spilled(response_data: Dict[str, Any]) -> bool:
+    """Whether a conversion result is a JSON document too large to hold in memory"""
+    return response_data["format"] == OutputFormat.json.value and len(response_data["document"]) > JSON_SPILL_THRESHOLD
+
+
+def iter_encoded(content: str):
+    """Yield the UTF-8 encoding of a string piece by piece to avoid a full encoded copy"""
+    for start in range(0, len(content), UPLOAD_CHUNK_SIZE):
+        yield content[start:start + UPLOAD_CHUNK_SIZE].encode("utf-8")
+
+
+async def build_response(response_data: Dict[str, Any], background_tasks: BackgroundTasks, stream: bool = False):
+    """Build the HTTP response for a conversion result
+
+    JSON documents are serialized directly with orjson, skipping a Pydantic
+    validation pass over the whole document tree; large ones are written to a
+    temp file and served from disk. Text-like output can be streamed as a raw
+    body, with the metadata moved into response headers.
+    Response data is built by this service, so the model skips re-validation.
+    """
+    output_format = response_data["format"]
+    if output_format == OutputFormat.json.value:
+        if not is_spilled(response_data):
+            body = await asyncio.to_thread(orjson.dumps, serializable(response_data))
+            return Response(content=body, media_type="application/json")
+
+        json_path = await write_tempfile(".json", write_json_response, response_data)
+        background_tasks.add_task(os.unlink, json_path)
+        return FileResponse(json_path, media_type="application/json")
+
+    if stream:
+        headers = {
+            "X-Docling-Page-Count": str(response_data["metadata"].get("page_count", 0)),
+            "X-Docling-Duration-Seconds": f"{response_data['duration_seconds']:.3f}",
+        }
+        return StreamingResponse(
+            iter_encoded(response_data["content"]),
+            media_type=STREAM_MEDIA_TYPES[output_format],
+            headers=headers
+        )
+
+    return ConvertResponse.model_construct(**response_data)
+
+
+def write_chunk(fd: int, chunk: bytes):
+    """Write a chunk straight to a raw file descriptor, bypassing Python-level buffering"""
+    view = memoryview(chunk)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def write_json_response(fd: int, response_data: Dict[str, Any]):
+    """Write JSON response data to a file around its pre-serialized document, without building the full body"""
+    envelope = orjson.dumps({key: value for key, value in response_data.items() if key != "document"})
+    write_chunk(fd, envelope[:-1] + b',"document":')
+    write_chunk(fd, response_data["document"])
+    write_chunk(fd, b"}")
+
+
+def write_job_response(fd: int, job: Dict[str, Any], response_data: Dict[str, Any]):
+    """Write a finished job to a file around its JSON response data, without building the full body"""
+    envelope = orjson.dumps({key: value for key, value in job.items() if key != "result"})
+    write_chunk(fd, envelope[:-1] + b',"result":')
+    write_json_response(fd, response_data)
+    write_chunk(fd, b"}")
+
+
+async def write_tempfile(suffix: str, write, *args) -> str:
+    """Write a temp file in a worker thread via write(fd, *args) and return its path
+
+    The file is removed again if writing fails or is cancelled.
+    """
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        await asyncio.to_thread(write, fd, *args)
+    except BaseException:
+        os.close(fd)
+        os.unlink(path)
+        raise
+    os.close(fd)
+    return path
+
+
+def hash_and_write_chunk(hasher, fd: int, chunk: bytes):
+    """Update a content hash with a chunk and write it to a raw file descriptor"""
+    hasher.update(chunk)
+    write_chunk(fd, chunk)
+
+
+def download_suffix(response: httpx.Response) -> str:
+    """File extension for a downloaded document, which docling falls back on when content sniffing fails
+
+    Taken from the Content-Disposition filename, then the URL path, then the Content-Type.
+    """
+    disposition = Message()
+    disposition["content-disposition"] = response.headers.get("content-disposition", "")
+    for name in (disposition.get_filename(), response.url.path):
+        if name and Path(name).suffix:
+            return Path(name).suffix
+    content_type = response.headers.get("content-type", "").split(";")[0].strip()
+    return mimetypes.guess_extension(content_type) or ""
+
+
+async def download_to_tempfile(url: str):
+    """Stream a remote document to a temporary file over the shared HTTP client
+
+    Returns the temporary file path and the response's ETag (or Last-Modified), if any.
+    """
+    file_size = 0
+    fd = tmp_file_path = None
+    try:
+        try:
+            async with app.state.http.stream("GET", url) as response:
+                response.raise_for_status()
+                validator = response.headers.get("etag") or response.headers.get("last-modified")
+                fd, tmp_file_path = tempfile.mkstemp(suffix=download_suffix(response))
+                async for chunk in response.aiter_bytes(UPLOAD_CHUNK_SIZE):
+                    file_size += len(chunk)
+                    if file_size > MAX_UPLOAD_SIZE:
+                        raise HTTPException(status_code=413, detail="Document size exceeds 100MB limit")
+                    await asyncio.to_thread(write_chunk, fd, chunk)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Download failed for {url}: {str(e)}")
+            raise HTTPException(status_code=502, detail=f"Failed to download document: {str(e)}")
+    except BaseException:
+        # Also covers cancellation, so the descriptor and temp file never leak
+        if fd is not None:
+            os.close(fd)
+            os.unlink(tmp_file_path)
+        raise
+
+    os.close(fd)
+    return tmp_file_path, validator
+
+
+async def get_cached_conversion(cache_key: str, url: str, start_time: float,
+                                revalidate: bool = True) -> Optional[Dict[str, Any]]:
+    """Return the cached conversion for a URL, dropping it if the source has changed"""
+    entry = url_cache.get(cache_key)
+    if entry is None:
+        return None
+
+    output_format, payload, page_count, validator = entry
+    if revalidate and validator is not None:
+        current = await fetch_url_validator(url)
+        if current is not None and current != validator:
+            logger.info(f"Cached conversion for {url} is stale, converting again")
+            url_cache.pop(cache_key, None)
+            return None
+
+    return cached_response_data(
+        output_format,
+        payload,
+        {"page_count": page_count, "source": url, "cache": "hit"},
+        start_time
+    )
+
+
+def cached_response_data(output_format: str, payload: Any, metadata: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+    """Build response data for a conversion served from cache"""
+    response_data = {
+        "status": "success",
+        "format": output_format,
+        "metadata": metadata,
+        "duration_seconds": time.time() - start_time
+    }
+    response_data[EXPORTERS[OutputFormat(output_format)][0]] = payload
+
+    return response_data
+
+
+def store_conversion(cache: TTLCache, cache_key: str, entry: tuple, description: str):
+    """Cache a (format, payload, page count, ...) entry unless it is too large to keep in memory"""
+    output_format, payload = entry[0], entry[1]
+    if output_format == OutputFormat.json.value and len(payload) > JSON_SPILL_THRESHOLD:
+        logger.info(f"Conversion of {description} is served from disk, not caching")
+        return
+    try:
+        cache[cache_key] = entry
+    except ValueError:
+        # Result is larger than the whole cache budget
+        logger.info(f"Conversion of {description} too large to cache")
+
+
+def upload_cache_key(digest: str, suffix: str, output_format: OutputFormat, ocr_enabled: bool,
+                     table_extraction: bool, formula_extraction: bool) -> str:
+    """Build the cache key for an upload conversion from the content hash and all conversion options"""
+    return repr((digest, suffix.lower(), output_format.value, ocr_enabled, table_extraction, formula_extraction))
+
+
+async def save_upload_to_tempfile(file: UploadFile):
+    """Stream an upload to a temporary file, enforcing the size limit and hashing the content
+
+    Returns the temporary file path, the number of bytes written and the content digest.
+    """
+    file_size = 0
+    hasher = hashlib.blake2b(digest_size=32)
+    fd, tmp_file_path = tempfile.mkstemp(suffix=Path(file.filename).suffix)
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            file_size += len(chunk)
+            if file_size > MAX_UPLOAD_SIZE:
+                raise HTTPException(status_code=413, detail="File size exceeds 100MB limit")
+            await asyncio.to_thread(hash_and_write_chunk, hasher, fd, chunk)
+    except BaseException:
+        os.close(fd)
+        os.unlink(tmp_file_path)
+        raise
+
+    os.close(fd)
+    return tmp_file_path, file_size, hasher.hexdigest()
+
+
+def enqueue_job(run) -> ORJSONResponse:
+    """Queue a conversion coroutine factory for the background workers and return 202 with the job id"""
+    job_id = uuid.uuid4().hex
+    job = {"job_id": job_id, "status": "queued", "result": None, "error": None}
+    try:
+        job_queue.put_nowait((job, run))
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Job queue full, please retry later")
+
+    pending_jobs[job_id] = job
+    logger.info(f"Queued conversion job {job_id}")
+    return ORJSONResponse(status_code=202, content=job, headers={"Location": f"/jobs/{job_id}"})
+
+
+def store_finished_job(job: Dict[str, Any], result_size: int, result_path: Optional[str]):
+    """Move a finished job from the pending jobs into the finished job store"""
+    pending_jobs.pop(job["job_id"], None)
+    try:
+        finished_jobs[job["job_id"]] = (job, JOB_ENTRY_OVERHEAD + result_size, result_path)
+    except ValueError:
+        # Result is larger than the whole store budget
+        logger.warning(f"Result of job {job['job_id']} too large to keep")
+        job.update(status="failed", result=None, error="Result too large to keep, convert synchronously instead")
+        finished_jobs[job["job_id"]] = (job, JOB_ENTRY_OVERHEAD, None)
+
+
+async def job_worker():
+    """Consume queued conversion jobs and record their results
+
+    Large JSON results are written to a temp file, served from disk by /jobs/{job_id}.
+    """
+    while True:
+        job, run = await job_queue.get()
+        result_size, result_path = 0, None
+        try:
+            job["status"] = "running"
+            response_data = await run()
+            if is_spilled(response_data):
+                result_path = await write_tempfile(
+                    ".json", write_job_response, {**job, "status": "completed"}, response_data
+                )
+            else:
+                job["result"] = serializable(response_data)
+                result_size = len(response_data[EXPORTERS[OutputFormat(response_data["format"])][0]])
+            job["status"] = "completed"
+        except HTTPException as e:
+            job["status"] = "failed"
+            job["error"] = str(e.detail)
+        except Exception as e:
+            logger.error(f"Job {job['job_id']} failed: {str(e)}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            store_finished_job(job, result_size, result_path)
+            job_queue.task_done()
+
+
 @app.get("/", response_class=PlainTextResponse)
 async def root():
     """Root endpoint with service information"""
@@ -104,6 +748,7 @@ Visit /docs for interactive API documentation.
 Endpoints:
 - POST /convert - Convert document from URL
 - POST /convert/upload - Convert uploaded document file
+- GET /jobs/{job_id} - Status and result of an asynchronous conversion
 - GET /health - Health check
 - GET /metrics - Prometheus metrics
 """
@@ -129,228 +774,269 @@ async def metrics():
     return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
-@app.post("/convert", response_model=ConvertResponse)
-async def convert_from_url(request: ConvertRequest):
+@app.post("/convert", response_model=ConvertResponse, responses={202: {"model": JobResponse}})
+async def convert_from_url(
+    request: ConvertRequest,
+    background_tasks: BackgroundTasks,
+    run_async: bool = Query(False, alias="async", description="Queue the conversion and return a job id")
+):
     """
     Convert a document from URL to specified format
 
     Supports various document formats including PDF, DOCX, PPTX, XLSX, HTML, images, etc.
+    With ?async=true the conversion runs in the background; poll /jobs/{job_id} for the result.
     """
     if converter is None:
         raise HTTPException(status_code=503, detail="DocumentConverter not initialized")
 
-    start_time = time.time()
-    active_conversions.inc()
+    if run_async:
+        return enqueue_job(lambda: convert_url_cached(request, time.time(), slot_timeout=None))
 
-    try:
-        logger.info(f"Starting conversion for URL: {request.url}")
+    response_data = await convert_url_cached(request, time.time())
+    return await build_response(response_data, background_tasks, stream=request.stream)
 
-        # Configure pipeline options based on request
-        pipeline_options = PipelineOptions()
-        pipeline_options.do_ocr = request.ocr_enabled
-        pipeline_options.do_table_structure = request.table_extraction
 
-        # Convert the document
-        with conversion_duration.time():
-            result = converter.convert(
-                str(request.url),
-                pipeline_options=pipeline_options
-            )
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Status and result of an asynchronous conversion job"""
+    job = pending_jobs.get(job_id)
+    if job is None:
+        entry = finished_jobs.get(job_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Job not found")
 
-        # Export based on requested format
-        if request.output_format == OutputFormat.markdown:
-            content = result.document.export_to_markdown()
-            response_data = {
-                "status": "success",
-                "format": "markdown",
-                "content": content,
-                "metadata": {
-                    "page_count": len(result.document.pages) if hasattr(result.document, 'pages') else 0,
-                    "source": str(request.url)
-                }
-            }
-        elif request.output_format == OutputFormat.json:
-            doc_dict = result.document.export_to_dict()
-            response_data = {
-                "status": "success",
-                "format": "json",
-                "document": doc_dict,
-                "metadata": {
-                    "page_count": len(result.document.pages) if hasattr(result.document, 'pages') else 0,
-                    "source": str(request.url)
-                }
-            }
-        elif request.output_format == OutputFormat.doctags:
-            content = result.document.export_to_doctags()
-            response_data = {
-                "status": "success",
-                "format": "doctags",
-                "content": content,
-                "metadata": {
-                    "page_count": len(result.document.pages) if hasattr(result.document, 'pages') else 0,
-                    "source": str(request.url)
-                }
-            }
-        else:  # text
-            content = result.document.export_to_text()
-            response_data = {
-                "status": "success",
-                "format": "text",
-                "content": content,
-                "metadata": {
-                    "page_count": len(result.document.pages) if hasattr(result.document, 'pages') else 0,
-                    "source": str(request.url)
-                }
-            }
-
-        duration = time.time() - start_time
-        response_data["duration_seconds"] = duration
-
-        conversion_counter.labels(format=request.output_format, status="success").inc()
-        logger.info(f"Conversion completed successfully in {duration:.2f}s")
-
-        return ConvertResponse(**response_data)
+        job, _, result_path = entry
+        if result_path is not None:
+            return FileResponse(result_path, media_type="application/json")
 
-    except Exception as e:
-        conversion_counter.labels(format=request.output_format, status="error").inc()
-        logger.error(f"Conversion failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Conversion failed: {str(e)}")
+    return ORJSONResponse(job)
+
+
+async def convert_url_cached(request: ConvertRequest, start_time: float,
+                             slot_timeout: Optional[float] = CONVERTER_LOCK_TIMEOUT) -> Dict[str, Any]:
+    """Convert a document from URL, serving from and populating the URL cache"""
+    url = str(request.url)
+    cache_key = url_cache_key(request)
+
+    cached = await get_cached_conversion(cache_key, url, start_time)
+    if cached is None:
+        lock = url_cache_locks.setdefault(cache_key, asyncio.Lock())
+        async with lock:
+            # A concurrent request may have converted the document while we waited
+            cached = await get_cached_conversion(cache_key, url, start_time, revalidate=False)
+            if cached is None:
+                response_data, validator = await run_url_conversion(request, slot_timeout)
+
+                payload = response_data[EXPORTERS[request.output_format][0]]
+                store_conversion(
+                    url_cache,
+                    cache_key,
+                    (response_data["format"], payload, response_data["metadata"]["page_count"], validator),
+                    url
+                )
+                return response_data
+
+    conversion_counter.labels(format=request.output_format, status="cache_hit").inc()
+    logger.info(f"Serving cached conversion for URL: {url}")
+    return cached
+
+
+async def run_url_conversion(request: ConvertRequest,
+                             slot_timeout: Optional[float] = CONVERTER_LOCK_TIMEOUT):
+    """Download and convert a document from URL without consulting the cache
+
+    Returns the response data and the source validator from the download.
+    """
+    # Download before taking a conversion slot so network I/O overlaps other conversions
+    logger.info(f"Downloading document from URL: {request.url}")
+    tmp_file_path, validator = await download_to_tempfile(str(request.url))
+
+    try:
+        response_data = await convert_local_file(
+            tmp_file_path,
+            request.output_format,
+            request.ocr_enabled,
+            request.table_extraction,
+            {"source": str(request.url), "cache": "miss"},
+            f"URL: {request.url}",
+            slot_timeout
+        )
+        return response_data, validator
     finally:
-        active_conversions.dec()
+        # Clean up temporary file
+        try:
+            os.unlink(tmp_file_path)
+        except:
+            pass
+
+
+async def convert_local_file(source: str, output_format: OutputFormat, ocr_enabled: bool, table_extraction: bool,
+                             metadata: Dict[str, Any], description: str,
+                             slot_timeout: Optional[float] = CONVERTER_LOCK_TIMEOUT) -> Dict[str, Any]:
+    """Convert a document saved locally, recording metrics; shared by the URL and upload paths"""
+    await acquire_conversion_slot(slot_timeout)
+    start_time = time.time()
+
+    with active_conversions.track_inprogress():
+        try:
+            logger.info(f"Starting conversion for {description}")
+
+            # Convert the document and export based on requested format
+            response_data = await convert_and_export(source, output_format, ocr_enabled, table_extraction, metadata)
 
+            duration = time.time() - start_time
+            response_data["duration_seconds"] = duration
+
+            conversion_counter.labels(format=output_format, status="success").inc()
+            logger.info(f"Conversion completed successfully in {duration:.2f}s")
 
-@app.post("/convert/upload", response_model=ConvertResponse)
+            return response_data
+
+        except Exception as e:
+            conversion_counter.labels(format=output_format, status="error").inc()
+            logger.error(f"Conversion failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Conversion failed: {str(e)}")
+        finally:
+            conversion_semaphore.release()
+
+
+@app.post("/convert/upload", response_model=ConvertResponse, responses={202: {"model": JobResponse}})
 async def convert_from_upload(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(..., description="Document file to convert"),
     output_format: OutputFormat = Form(OutputFormat.markdown),
     ocr_enabled: bool = Form(True),
     table_extraction: bool = Form(True),
-    formula_extraction: bool = Form(True)
+    formula_extraction: bool = Form(True),
+    stream: bool = Form(False),
+    run_async: bool = Query(False, alias="async", description="Queue the conversion and return a job id")
 ):
     """
     Convert an uploaded document file to specified format
 
     Supports various document formats including PDF, DOCX, PPTX, XLSX, HTML, images, etc.
+    With ?async=true the conversion runs in the background; poll /jobs/{job_id} for the result.
     """
     if converter is None:
         raise HTTPException(status_code=503, detail="DocumentConverter not initialized")
 
     start_time = time.time()
-    active_conversions.inc()
-
-    # Validate file size (max 100MB)
-    if file.size > 100 * 1024 * 1024:
-        raise HTTPException(status_code=413, detail="File size exceeds 100MB limit")
-
-    try:
-        logger.info(f"Starting conversion for uploaded file: {file.filename}")
-
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file_path = tmp_file.name
+    filename = file.filename
+    tmp_file_path, file_size, digest = await save_upload_to_tempfile(file)
+    cache_key = upload_cache_key(
+        digest, Path(filename).suffix, output_format, ocr_enabled, table_extraction, formula_extraction
+    )
 
+    if run_async:
         try:
-            # Configure pipeline options
-            pipeline_options = PipelineOptions()
-            pipeline_options.do_ocr = ocr_enabled
-            pipeline_options.do_table_structure = table_extraction
-
-            # Convert the document
-            with conversion_duration.time():
-                result = converter.convert(
-                    tmp_file_path,
-                    pipeline_options=pipeline_options
-                )
+            return enqueue_job(lambda: convert_upload_cached(
+                tmp_file_path, filename, file_size, cache_key, output_format, ocr_enabled, table_extraction,
+                time.time(), slot_timeout=None
+            ))
+        except HTTPException:
+            os.unlink(tmp_file_path)
+            raise
 
-            # Export based on requested format
-            if output_format == OutputFormat.markdown:
-                content = result.document.export_to_markdown()
-                response_data = {
-                    "status": "success",
-                    "format": "markdown",
-                    "content": content,
-                    "metadata": {
-                        "page_count": len(result.document.pages) if hasattr(result.document, 'pages') else 0,
-                        "filename": file.filename,
-                        "file_size": file.size
-                    }
-                }
-            elif output_format == OutputFormat.json:
-                doc_dict = result.document.export_to_dict()
-                response_data = {
-                    "status": "success",
-                    "format": "json",
-                    "document": doc_dict,
-                    "metadata": {
-                        "page_count": len(result.document.pages) if hasattr(result.document, 'pages') else 0,
-                        "filename": file.filename,
-                        "file_size": file.size
-                    }
-                }
-            elif output_format == OutputFormat.doctags:
-                content = result.document.export_to_doctags()
-                response_data = {
-                    "status": "success",
-                    "format": "doctags",
-                    "content": content,
-                    "metadata": {
-                        "page_count": len(result.document.pages) if hasattr(result.document, 'pages') else 0,
-                        "filename": file.filename,
-                        "file_size": file.size
-                    }
-                }
-            else:  # text
-                content = result.document.export_to_text()
-                response_data = {
-                    "status": "success",
-                    "format": "text",
-                    "content": content,
-                    "metadata": {
-                        "page_count": len(result.document.pages) if hasattr(result.document, 'pages') else 0,
-                        "filename": file.filename,
-                        "file_size": file.size
-                    }
-                }
+    response_data = await convert_upload_cached(
+        tmp_file_path, filename, file_size, cache_key, output_format, ocr_enabled, table_extraction, start_time
+    )
+    return await build_response(response_data, background_tasks, stream=stream)
 
-            duration = time.time() - start_time
-            response_data["duration_seconds"] = duration
 
-            conversion_counter.labels(format=output_format, status="success").inc()
-            logger.info(f"Conversion completed successfully in {duration:.2f}s")
+async def convert_upload_cached(tmp_file_path: str, filename: str, file_size: int, cache_key: str,
+                                output_format: OutputFormat, ocr_enabled: bool, table_extraction: bool,
+                                start_time: float,
+                                slot_timeout: Optional[float] = CONVERTER_LOCK_TIMEOUT) -> Dict[str, Any]:
+    """Convert a saved upload, serving from and populating the upload cache, then remove the temp file"""
+    try:
+        cached = upload_cache.get(cache_key)
+        if cached is not None:
+            conversion_counter.labels(format=output_format, status="cache_hit").inc()
+            logger.info(f"Serving cached conversion for uploaded file: {filename}")
+            output_format_value, payload, page_count = cached
+            return cached_response_data(
+                output_format_value,
+                payload,
+                {"page_count": page_count, "filename": filename, "file_size": file_size, "cache": "hit"},
+                start_time
+            )
 
-            return ConvertResponse(**response_data)
+        response_data = await convert_local_file(
+            tmp_file_path,
+            output_format,
+            ocr_enabled,
+            table_extraction,
+            {"filename": filename, "file_size": file_size, "cache": "miss"},
+            f"uploaded file: {filename}",
+            slot_timeout
+        )
 
-        finally:
-            # Clean up temporary file
-            try:
-                os.unlink(tmp_file_path)
-            except:
-                pass
+        payload = response_data[EXPORTERS[output_format][0]]
+        store_conversion(
+            upload_cache, cache_key, (response_data["format"], payload, response_data["metadata"]["page_count"]), filename
+        )
+        return response_data
 
-    except Exception as e:
-        conversion_counter.labels(format=output_format, status="error").inc()
-        logger.error(f"Conversion failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Conversion failed: {str(e)}")
     finally:
-        active_conversions.dec()
+        # Clean up temporary file
+        try:
+            os.unlink(tmp_file_path)
+        except:
+            pass
 
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize resources on startup"""
     logger.info("Docling API service starting up...")
+    asyncio.get_running_loop().set_default_executor(executor)
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=60,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+    )
+    app.state.process_pool = None
+    if PROCESS_WORKERS > 0:
+        app.state.process_pool = create_process_pool()
+        await prestart_process_pool(app.state.process_pool)
+    app.state.job_workers = [asyncio.create_task(job_worker()) for _ in range(JOB_WORKERS)]
     if converter is None:
         logger.error("WARNING: DocumentConverter failed to initialize during startup")
     else:
+        # With a process pool the workers warm their own converters; the parent never converts
+        if WARMUP_ENABLED and app.state.process_pool is None:
+            await warmup_converter()
         logger.info("Service ready to accept requests")
 
 
+async def warmup_converter():
+    """Run a small conversion to load models into memory (default PDF options enable OCR and tables)"""
+    if not Path(WARMUP_DOCUMENT).is_file():
+        logger.warning(f"Warmup document not found at {WARMUP_DOCUMENT}, skipping warmup")
+        return
+
+    logger.info(f"Warming up DocumentConverter with {WARMUP_DOCUMENT}...")
+    start_time = time.time()
+    try:
+        await asyncio.to_thread(converter.convert, WARMUP_DOCUMENT)
+        logger.info(f"Warmup completed in {time.time() - start_time:.2f}s")
+    except Exception as e:
+        logger.warning(f"Warmup conversion failed: {str(e)}")
+
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup resources on shutdown"""
     logger.info("Docling API service shutting down...")
+    for worker in app.state.job_workers:
+        worker.cancel()
+    await app.state.http.aclose()
+    if app.state.process_pool is not None:
+        app.state.process_pool.shutdown(wait=False, cancel_futures=True)
+    executor.shutdown(wait=False)
+    # Remove spilled job results
+    finished_jobs.clear()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,503 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+# The API service needs its web stack on top of docling itself
+api = pytest.importorskip("api")
+httpx = pytest.importorskip("httpx")
+TestClient = pytest.importorskip("fastapi.testclient").TestClient
+
+PDF_BYTES = b"%PDF-1.4 stub document"
+
+
+class StubDocument:
+    pages = {1: None, 2: None}
+
+    def export_to_markdown(self):
+        return "# Title\n\nBody"
+
+    def export_to_dict(self):
+        return {"name": "stub", "texts": ["Title", "Body"]}
+
+    def export_to_doctags(self):
+        return "<doctag>Title</doctag>"
+
+    def export_to_text(self):
+        return "Title\n\nBody"
+
+
+class StubResult:
+    def __init__(self):
+        self.document = StubDocument()
+
+
+class StubConverter:
+    def __init__(self):
+        self.sources = []
+
+    def convert(self, source):
+        assert os.path.isfile(source)
+        self.sources.append(source)
+        return StubResult()
+
+
+@pytest.fixture
+def stub_converter(monkeypatch):
+    stub = StubConverter()
+    monkeypatch.setattr(api, "converter", stub)
+    monkeypatch.setattr(api, "converter_for", lambda do_ocr, do_table_structure: stub)
+    monkeypatch.setattr(api, "WARMUP_ENABLED", False)
+    monkeypatch.setattr(api, "PROCESS_WORKERS", 0)
+    # Shutdown closes the executor and asyncio primitives bind to the first loop using them;
+    # each TestClient runs its own startup, shutdown and loop
+    monkeypatch.setattr(api, "executor", ThreadPoolExecutor(max_workers=2))
+    monkeypatch.setattr(
+        api, "conversion_semaphore", asyncio.Semaphore(api.MAX_CONCURRENT_CONVERSIONS)
+    )
+    monkeypatch.setattr(api, "job_queue", asyncio.Queue(maxsize=api.JOB_QUEUE_SIZE))
+    for store in (api.url_cache, api.upload_cache, api.pending_jobs, api.finished_jobs):
+        store.clear()
+    return stub
+
+
+@pytest.fixture
+def client(stub_converter):
+    with TestClient(api.app) as client:
+        yield client
+
+
+def mock_http(handler):
+    api.app.state.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def upload(client, content=PDF_BYTES, path="/convert/upload", **data):
+    return client.post(path, files={"file": ("doc.pdf", content)}, data=data)
+
+
+def test_job_queue_full(stub_converter, monkeypatch):
+    monkeypatch.setattr(api, "JOB_WORKERS", 0)
+    monkeypatch.setattr(api, "job_queue", asyncio.Queue(maxsize=1))
+    with TestClient(api.app) as client:
+        assert upload(client, path="/convert/upload?async=true").status_code == 202
+        assert upload(client, path="/convert/upload?async=true").status_code == 503
+
+
+def wait_for_job(client, location, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(location).json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.01)
+    pytest.fail(f"Job at {location} did not finish")
+
+
+def test_async_job(client, stub_converter):
+    response = upload(client, path="/convert/upload?async=true", output_format="json")
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.headers["location"] == f"/jobs/{job_id}"
+
+    job = wait_for_job(client, response.headers["location"])
+    assert job["status"] == "completed"
+    assert job["result"]["document"] == StubDocument().export_to_dict()
+    assert job_id in api.finished_jobs
+    assert job_id not in api.pending_jobs
+
+
+def test_async_job_failure(client, stub_converter, monkeypatch):
+    def fail(source):
+        raise RuntimeError("conversion exploded")
+
+    monkeypatch.setattr(stub_converter, "convert", fail)
+    response = upload(client, path="/convert/upload?async=true")
+    job = wait_for_job(client, response.headers["location"])
+    assert job["status"] == "failed"
+    assert "conversion exploded" in job["error"]
+
+
+def test_unknown_job(client):
+    assert client.get("/jobs/does-not-exist").status_code == 404
+
+
+def test_async_job_spill(client, monkeypatch):
+    monkeypatch.setattr(api, "JSON_SPILL_THRESHOLD", 0)
+    response = upload(client, path="/convert/upload?async=true", output_format="json")
+    job_id = response.json()["job_id"]
+
+    job = wait_for_job(client, response.headers["location"])
+    assert job["status"] == "completed"
+    assert job["result"]["document"] == StubDocument().export_to_dict()
+    assert job["result"]["metadata"]["page_count"] == 2
+
+    # Served from disk, and removed with its entry
+    _, _, result_path = api.finished_jobs[job_id]
+    assert os.path.isfile(result_path)
+    api.finished_jobs.clear()
+    assert not os.path.exists(result_path)
+
+
+def test_job_store_bounded_by_bytes(tmp_path):
+    store = api.JobStore(
+        maxsize=3 * api.JOB_ENTRY_OVERHEAD, ttl=60, getsizeof=api.finished_job_size
+    )
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"{i}.json"
+        path.write_bytes(b"{}")
+        paths.append(path)
+        store[str(i)] = ({"job_id": str(i)}, api.JOB_ENTRY_OVERHEAD, str(path))
+
+    assert len(store) == 3
+    assert [path.exists() for path in paths] == [False, True, True, True]
+
+    store.expire(time.monotonic() + 120)
+    assert len(store) == 0
+    assert not any(path.exists() for path in paths)
+
+
+@pytest.mark.parametrize(
+    ("url", "headers", "suffix"),
+    [
+        (
+            "https://example.com/download?id=3",
+            {"content-disposition": 'attachment; filename="notes.md"'},
+            ".md",
+        ),
+        (
+            "https://example.com/files/report.docx",
+            {"content-disposition": "inline"},
+            ".docx",
+        ),
+        ("https://example.com/download?id=4", {"content-type": "text/csv"}, ".csv"),
+    ],
+)
+def test_download_suffix(client, stub_converter, url, headers, suffix):
+    mock_http(lambda request: httpx.Response(200, content=b"a,b", headers=headers))
+    response = client.post("/convert", json={"url": url})
+    assert response.status_code == 200
+    assert [os.path.splitext(source)[1] for source in stub_converter.sources] == [
+        suffix
+    ]
+    assert not os.path.exists(stub_converter.sources[0])
+
+
+def test_download_too_large(client, stub_converter, monkeypatch):
+    monkeypatch.setattr(api, "MAX_UPLOAD_SIZE", 8)
+    mock_http(lambda request: httpx.Response(200, content=b"x" * 64))
+    response = client.post("/convert", json={"url": "https://example.com/big.pdf"})
+    assert response.status_code == 413
+    assert stub_converter.sources == []
+
+
+def test_download_failure(client, stub_converter):
+    mock_http(lambda request: httpx.Response(404))
+    response = client.post("/convert", json={"url": "https://example.com/gone.pdf"})
+    assert response.status_code == 502
+    assert stub_converter.sources == []
+
+
+def multipart_body(content):
+    return (
+        b"--x\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="doc.pdf"\r\n\r\n'
+        + content
+        + b"\r\n--x--\r\n"
+    )
+
+
+@pytest.mark.parametrize("path", ["/convert/upload", "/convert/upload/"])
+def test_upload_too_large_by_header(client, stub_converter, path):
+    response = client.post(
+        path,
+        content=b"x",
+        headers={
+            "content-length": str(api.MAX_UPLOAD_REQUEST_SIZE + 1),
+            "content-type": "multipart/form-data; boundary=x",
+        },
+        follow_redirects=False,
+    )
+    assert response.status_code == 413
+    assert stub_converter.sources == []
+
+
+def test_upload_too_large_by_header_under_root_path(stub_converter):
+    with TestClient(api.app, root_path="/docling") as client:
+        response = client.post(
+            "/convert/upload",
+            content=b"x",
+            headers={
+                "content-length": str(api.MAX_UPLOAD_REQUEST_SIZE + 1),
+                "content-type": "multipart/form-data; boundary=x",
+            },
+        )
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize(
+    ("path", "root_path", "expected"),
+    [
+        ("/convert/upload", "", "/convert/upload"),
+        ("/convert/upload/", "", "/convert/upload"),
+        ("/docling/convert/upload", "/docling", "/convert/upload"),
+        ("/convert/upload", "/docling", "/convert/upload"),
+        ("/", "", "/"),
+    ],
+)
+def test_route_path(path, root_path, expected):
+    assert api.route_path({"path": path, "root_path": root_path}) == expected
+
+
+def test_upload_too_large_chunked(client, stub_converter, monkeypatch):
+    monkeypatch.setattr(api, "MAX_UPLOAD_REQUEST_SIZE", 1024)
+    body = multipart_body(b"x" * 4096)
+    response = client.post(
+        "/convert/upload",
+        content=(body[start : start + 512] for start in range(0, len(body), 512)),
+        headers={"content-type": "multipart/form-data; boundary=x"},
+    )
+    assert "content-length" not in response.request.headers
+    assert response.status_code == 413
+    assert stub_converter.sources == []
+
+
+def test_upload_chunked_within_limit(client, stub_converter):
+    body = multipart_body(PDF_BYTES)
+    response = client.post(
+        "/convert/upload",
+        content=iter([body]),
+        headers={"content-type": "multipart/form-data; boundary=x"},
+    )
+    assert response.status_code == 200
+    assert len(stub_converter.sources) == 1
+
+
+def test_upload_too_large_by_body(client, stub_converter, monkeypatch):
+    monkeypatch.setattr(api, "MAX_UPLOAD_SIZE", 8)
+    response = upload(client, content=b"x" * 64)
+    assert response.status_code == 413
+    assert stub_converter.sources == []
+
+
+def test_upload_conversion(client, stub_converter):
+    response = upload(client)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["content"] == "# Title\n\nBody"
+    assert body["metadata"]["page_count"] == 2
+    assert body["metadata"]["file_size"] == len(PDF_BYTES)
+    assert len(stub_converter.sources) == 1
+    assert not os.path.exists(stub_converter.sources[0])
+
+
+class InlinePool(Executor):
+    """Stands in for the process pool, running work in the calling thread"""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class CrashingPool(InlinePool):
+    """Breaks like a pool whose worker died during a conversion"""
+
+    def submit(self, fn, *args, **kwargs):
+        if fn is api.convert_in_worker:
+            raise BrokenProcessPool("worker died")
+        return super().submit(fn, *args, **kwargs)
+
+
+class BrokenPool(Executor):
+    def submit(self, fn, *args, **kwargs):
+        raise BrokenProcessPool("worker died")
+
+
+def test_process_pool_recovers(stub_converter, monkeypatch):
+    pools = [CrashingPool(), InlinePool()]
+    monkeypatch.setattr(api, "PROCESS_WORKERS", 1)
+    monkeypatch.setattr(api, "create_process_pool", lambda: pools.pop(0))
+    # The workers warm up their own converters, the parent never converts
+    monkeypatch.setattr(api, "WARMUP_ENABLED", True)
+    monkeypatch.setattr(api, "WARMUP_DOCUMENT", __file__)
+
+    with TestClient(api.app) as client:
+        assert upload(client).status_code == 500
+        response = upload(client, output_format="json")
+        assert response.status_code == 200
+        assert response.json()["document"] == StubDocument().export_to_dict()
+        assert response.json()["metadata"]["page_count"] == 2
+
+    assert pools == []
+    assert __file__ not in stub_converter.sources
+    assert len(stub_converter.sources) == 1
+
+
+def test_process_pool_restart_failure_is_logged(stub_converter, monkeypatch, caplog):
+    pools = [CrashingPool(), BrokenPool()]
+    monkeypatch.setattr(api, "PROCESS_WORKERS", 1)
+    monkeypatch.setattr(api, "create_process_pool", lambda: pools.pop(0))
+
+    with TestClient(api.app) as client:
+        assert upload(client).status_code == 500
+        deadline = time.monotonic() + 5
+        while "Restarting the conversion process pool failed" not in caplog.text:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+
+def test_server_busy(client, stub_converter, monkeypatch):
+    monkeypatch.setattr(api, "conversion_semaphore", asyncio.Semaphore(0))
+    response = upload(client)
+    assert response.status_code == 503
+    assert stub_converter.sources == []
+
+
+def test_url_cache(client, stub_converter):
+    requests = []
+
+    def handler(request):
+        requests.append(request.method)
+        return httpx.Response(200, content=PDF_BYTES, headers={"etag": '"v1"'})
+
+    mock_http(handler)
+    payload = {"url": "https://example.com/doc.pdf"}
+    first = client.post("/convert", json=payload)
+    second = client.post("/convert", json=payload)
+    assert first.status_code == second.status_code == 200
+    assert first.json()["metadata"]["cache"] == "miss"
+    assert second.json()["metadata"]["cache"] == "hit"
+    assert second.json()["content"] == first.json()["content"]
+    assert len(stub_converter.sources) == 1
+    # The validator comes from the download; only the hit revalidates with HEAD
+    assert requests == ["GET", "HEAD"]
+
+    # Other options are a separate entry
+    client.post("/convert", json={**payload, "output_format": "text"})
+    assert len(stub_converter.sources) == 2
+
+
+def test_url_cache_revalidation(client, stub_converter):
+    etags = iter(['"v1"', '"v2"', '"v2"'])
+
+    def handler(request):
+        return httpx.Response(200, content=PDF_BYTES, headers={"etag": next(etags)})
+
+    mock_http(handler)
+    payload = {"url": "https://example.com/doc.pdf"}
+    client.post("/convert", json=payload)
+    response = client.post("/convert", json=payload)
+    assert response.status_code == 200
+    assert response.json()["metadata"]["cache"] == "miss"
+    assert len(stub_converter.sources) == 2
+
+
+def test_converter_for():
+    api.converter_for.cache_clear()
+    try:
+        if api.converter is not None:
+            assert api.converter_for(True, True) is api.converter
+
+        converter = api.converter_for(False, True)
+        assert api.converter_for(False, True) is converter
+        options = converter.format_to_options[api.InputFormat.PDF].pipeline_options
+        assert options.do_ocr is False
+        assert options.do_table_structure is True
+    finally:
+        api.converter_for.cache_clear()
+
+
+@pytest.mark.parametrize(
+    ("output_format", "media_type", "body"),
+    [
+        ("text", "text/plain", "Title\n\nBody"),
+        ("markdown", "text/markdown", "# Title\n\nBody"),
+    ],
+)
+def test_stream(client, output_format, media_type, body):
+    response = upload(client, output_format=output_format, stream="true")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(media_type)
+    assert response.headers["x-docling-page-count"] == "2"
+    assert float(response.headers["x-docling-duration-seconds"]) >= 0
+    assert response.text == body
+
+
+def test_warmup(stub_converter, monkeypatch, caplog):
+    caplog.set_level(logging.INFO, logger="api")
+    warmup_document = "./tests/data/pdf/2305.03393v1-pg9.pdf"
+    monkeypatch.setattr(api, "WARMUP_ENABLED", True)
+    monkeypatch.setattr(api, "WARMUP_DOCUMENT", warmup_document)
+    with TestClient(api.app):
+        pass
+    assert stub_converter.sources == [warmup_document]
+    assert "Warmup completed" in caplog.text
+
+
+def test_warmup_failure_does_not_block_startup(stub_converter, monkeypatch, caplog):
+    def fail(source):
+        raise RuntimeError("models missing")
+
+    monkeypatch.setattr(stub_converter, "convert", fail)
+    monkeypatch.setattr(api, "WARMUP_ENABLED", True)
+    monkeypatch.setattr(api, "WARMUP_DOCUMENT", "./tests/data/pdf/2305.03393v1-pg9.pdf")
+    with TestClient(api.app) as client:
+        assert client.get("/health").status_code == 200
+    assert "Warmup conversion failed: models missing" in caplog.text
+
+
+def test_upload_cache(client, stub_converter):
+    first = upload(client, output_format="json")
+    second = upload(client, output_format="json")
+    assert first.status_code == second.status_code == 200
+    assert first.json()["metadata"]["cache"] == "miss"
+    assert second.json()["metadata"]["cache"] == "hit"
+    assert second.json()["document"] == first.json()["document"]
+    assert len(stub_converter.sources) == 1
+
+    # Different options or content are separate entries
+    upload(client, output_format="text")
+    upload(client, content=PDF_BYTES + b"changed", output_format="json")
+    assert len(stub_converter.sources) == 3
+
+
+def test_upload_cache_bounded_by_bytes(client, stub_converter, monkeypatch):
+    cache = api.TTLCache(maxsize=48, ttl=60, getsizeof=api.cached_entry_size)
+    monkeypatch.setattr(api, "upload_cache", cache)
+    upload(client, output_format="json")
+    upload(client, output_format="markdown")
+    # The serialized JSON document and markdown don't fit together
+    assert len(cache) == 1
+    assert cache.currsize <= 48
+
+
+def test_json_spill(client, stub_converter, monkeypatch, tmp_path):
+    monkeypatch.setattr(api, "JSON_SPILL_THRESHOLD", 0)
+    monkeypatch.setattr(api.tempfile, "tempdir", str(tmp_path))
+    mock_http(lambda request: httpx.Response(200, content=PDF_BYTES))
+
+    for _ in range(2):
+        response = upload(client, output_format="json")
+        assert response.status_code == 200
+        assert response.json()["document"] == StubDocument().export_to_dict()
+        assert response.json()["metadata"]["page_count"] == 2
+
+        response = client.post(
+            "/convert",
+            json={"url": "https://example.com/doc.pdf", "output_format": "json"},
+        )
+        assert response.status_code == 200
+        assert response.json()["document"] == StubDocument().export_to_dict()
+
+    # Spilled documents are neither cached nor left on disk
+    assert len(stub_converter.sources) == 4
+    assert len(api.upload_cache) == len(api.url_cache) == 0
+    assert list(tmp_path.iterdir()) == []